@@ -510,7 +510,7 @@ def user_warning_email(user_obj, new_status_group, badness_timestamp,
     mem_quota_gb = sysinfo.pct_to_gb(mem_quota)
 
     # Convert mem pcts to gb for each process
-    hist = history_mem_to_gb(user_obj.history_iter())
+    hist = history_mem_to_gb(user_obj.history_iter(copy=True))
 
     # Creates a dict of times, with a value of a list of processes per time
     events = {e["time"]: list(e["pids"].values()) for e in hist}
@@ -9,12 +9,17 @@ A badness is simply a rolling score of each resources tracked. A badness score
 is the sum of all the badness.
 """
 
-import collections
 import datetime
 import time
 import types
 
-from cfgparser import cfg
+from cfgparser import cfg, on_load
+
+# Configuration derived values used every time a delta badness is computed,
+# see cache_cfg_values(). badness_rates contains the badness threshold, max
+# increase and max decrease in badness per interval for each metric.
+badness_rates = {}
+cap_usage = False
 
 
 class Badness(types.SimpleNamespace):
@@ -85,7 +90,7 @@ class Badness(types.SimpleNamespace):
         """
         Returns whether the badness score is nonzero.
         """
-        return not self.is_good()
+        return self.cpu != 0 or self.mem != 0
 
     def score(self):
         """
@@ -116,10 +121,11 @@ class Badness(types.SimpleNamespace):
         self.cpu = min(100.0, max(0.0, self.cpu + delta["cpu"]))
         self.mem = min(100.0, max(0.0, self.mem + delta["mem"]))
 
-        if was_bad and self.is_good():
-            self.start_of_bad_ts = 0
-        elif not was_bad and self.is_bad():
-            self.start_of_bad_ts = self.update_ts
+        # The start of badness only changes when the user goes from good to
+        # bad (starts now) or bad to good (no longer bad)
+        is_bad = self.is_bad()
+        if is_bad != was_bad:
+            self.start_of_bad_ts = self.update_ts if is_bad else 0
 
     def __repr__(self):
         return "Badness(cpu={}, mem={}, updated={}, started_bad={})".format(
@@ -151,38 +157,72 @@ def calc_delta_badness(usage, quotas):
     quotas: dict
         A dictionary of quotas with "cpu" and "mem" keys.
     """
+    return {
+        "cpu": _delta_badness(usage["cpu"], quotas["cpu"],
+                              *badness_rates["cpu"], cap_usage),
+        "mem": _delta_badness(usage["mem"], quotas["mem"],
+                              *badness_rates["mem"], cap_usage),
+    }
+
+
+def _delta_badness(usage, quota, threshold, max_incr_per_interval,
+                   max_decr_per_interval, cap_usage):
+    """
+    Computes the delta badness of a single metric. This is purely numeric
+    and doesn't look at the configuration; see calc_delta_badness().
+
+    usage: float
+        The usage of the metric.
+    quota: float
+        The quota of the metric.
+    threshold: float
+        The badness threshold, as a fraction of the quota.
+    max_incr_per_interval: float
+        The max increase in badness per interval.
+    max_decr_per_interval: float
+        The max decrease in badness per interval.
+    cap_usage: bool
+        Whether to cap the usage at the quota.
+    """
+    if cap_usage:
+        usage = min(usage, quota)
+
+    rel_usage = usage / quota
+    if rel_usage >= threshold:
+        return rel_usage * max_incr_per_interval
+    return (1 - rel_usage) * -max_decr_per_interval
+
+
+def cache_cfg_values():
+    """
+    Caches the configuration derived values used to compute delta badness.
+    These only depend on the configuration and are the same for every user,
+    so this is done whenever a configuration is loaded rather than for every
+    delta badness computed.
+    """
+    global cap_usage
     refresh = cfg.general.arbiter_refresh
     time_to_max_bad = cfg.badness.time_to_max_bad
     time_to_min_bad = cfg.badness.time_to_min_bad
 
-    Metric = collections.namedtuple("Metric", "quota usage threshold")
-    metrics = {
-        "cpu": Metric(quotas["cpu"], usage["cpu"], cfg.badness.cpu_badness_threshold),
-        "mem": Metric(quotas["mem"], usage["mem"], cfg.badness.mem_badness_threshold),
+    # Calculate the increase/decrease in badness (to translate the time and
+    # extreme scores to a change per interval)
+    max_decr_per_sec = 100.0 / time_to_min_bad
+    max_decr_per_interval = max_decr_per_sec * refresh
+    thresholds = {
+        "cpu": cfg.badness.cpu_badness_threshold,
+        "mem": cfg.badness.mem_badness_threshold,
     }
-
-    delta = {}
-    for name, metric in metrics.items():
-        # Calculate the increase/decrease in badness (to translate the time
-        # and extreme scores to a change per interval)
-        max_incr_per_sec = 100.0 / (time_to_max_bad * metric.threshold)
+    for name, threshold in thresholds.items():
+        max_incr_per_sec = 100.0 / (time_to_max_bad * threshold)
         max_incr_per_interval = max_incr_per_sec * refresh
-        max_decr_per_sec = 100.0 / time_to_min_bad
-        max_decr_per_interval = max_decr_per_sec * refresh
-
-        usage = metric.usage
-        # Make badness scores consistent between debug and non-debug mode
-        # (where usage cannot exceed the quota) or optionally cap the
-        # badness increase by capping the usage to shield against
-        # erroneous data
-        if cfg.general.debug_mode or cfg.badness.cap_badness_incr:
-            usage = min(metric.usage, metric.quota)
-
-        rel_usage = usage / metric.quota
-        if rel_usage >= metric.threshold:
-            change = rel_usage * max_incr_per_interval
-        else:
-            change = (1 - rel_usage) * -max_decr_per_interval
-        delta[name] = change
-
-    return delta
+        badness_rates[name] = (threshold, max_incr_per_interval,
+                               max_decr_per_interval)
+
+    # Make badness scores consistent between debug and non-debug mode (where
+    # usage cannot exceed the quota) or optionally cap the badness increase
+    # by capping the usage to shield against erroneous data
+    cap_usage = cfg.general.debug_mode or cfg.badness.cap_badness_incr
+
+
+on_load(cache_cfg_values)
@@ -72,6 +72,11 @@ shared = Configuration({
     "log_datefmt": "%Y-%m-%d"
 })
 
+# Functions that are called (without arguments) every time a configuration is
+# loaded into cfg. This allows modules to cache values derived from the
+# configuration and keep them up to date.
+load_callbacks = []
+
 
 class ValidationProtocol():
     """
@@ -804,9 +809,25 @@ def load_config(*config_files, check=True, pedantic=True):
         return False
 
     cfg.add_subconfig(config)
+    for callback in load_callbacks:
+        callback()
     return True
 
 
+def on_load(callback):
+    """
+    Registers a function to be called every time a configuration is loaded
+    into cfg. If a configuration has already been loaded, the function is
+    also called immediately.
+
+    callback: func
+        A function that takes no arguments.
+    """
+    load_callbacks.append(callback)
+    if vars(cfg):
+        callback()
+
+
 def arguments():
     desc = "Check for errors or print the resulting config.toml."
     parser = argparse.ArgumentParser(description=desc)
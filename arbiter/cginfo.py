@@ -329,8 +329,6 @@ class StaticSystemdCGroup(usage.Usage, SystemdCGroup):
         """
         if isinstance(other, type(self)):
             new = super().__add__(other)
-            new.name = self.name
-            new.parent = self.parent
             new._pids = list(set(self._pids + other._pids))
             return new
         return super().__add__(other)
@@ -342,8 +340,6 @@ class StaticSystemdCGroup(usage.Usage, SystemdCGroup):
         """
         if isinstance(other, type(self)):
             new = super().__sub__(other)
-            new.name = self.name
-            new.parent = self.parent
             new._pids = list(set(self._pids + other._pids))
             return new
         return super().__sub__(other)
@@ -520,24 +516,6 @@ class StaticUserSlice(StaticSystemdCGroup, UserSlice):
         kwargs.pop("parent", None)
         super().__init__(self.name, self.parent, **kwargs)
 
-    def __add__(self, other):
-        """
-        Adds two UserSlice objects together by taking the values of the first
-        and adding the usage and pids.
-        """
-        new = super().__add__(other)
-        new.uid = self.uid
-        return new
-
-    def __sub__(self, other):
-        """
-        Subtracts two UserSlice objects together by taking the values of the
-        first and subtracting the usage and adding the pids.
-        """
-        new = super().__sub__(other)
-        new.uid = self.uid
-        return new
-
 
 class UserSliceInstance(SystemdCGroupInstance, UserSlice):
     """
@@ -9,7 +9,6 @@ Classes and methods related to monitoring the overall usage on the machine.
 import collections
 import itertools
 import logging
-import multiprocessing
 import time
 
 import actions
@@ -47,7 +46,7 @@ class HighUsageWatcher:
             # period, rather than immediately due to a lack of data
             self.history.appendleft(usage.metrics.copy())
 
-        cpu_count = multiprocessing.cpu_count()
+        cpu_count = sysinfo.cpu_count
         if cfg.high_usage_watcher.div_cpu_thresholds_by_threads_per_core:
             cpu_count /= sysinfo.threads_per_core
         self.cpu_threshold = cfg.high_usage_watcher.cpu_usage_threshold * cpu_count
@@ -78,9 +77,11 @@ class HighUsageWatcher:
         if self.timer.delta() > 0:
             return
 
+        # The thresholds are fractions, but the usage is a percent
+        cpu_threshold_pct = self.cpu_threshold * 100
+        mem_threshold_pct = self.mem_threshold * 100
         is_high_usage = all(
-            event["cpu"] > self.cpu_threshold * 100
-            or event["mem"] > self.mem_threshold * 100
+            event["cpu"] > cpu_threshold_pct or event["mem"] > mem_threshold_pct
             for event in self.history
         )
         if not is_high_usage:
@@ -102,7 +103,7 @@ class HighUsageWatcher:
         # care about usage, not a persons status.
         return usage.rel_sorted(
             user_dict.values(),
-            multiprocessing.cpu_count() * 100, 100,
+            sysinfo.cpu_count * 100, 100,
             key=lambda user_obj: user_obj.last_cgroup_usage(),
             reverse=True
         )[:self.user_count]
@@ -16,7 +16,6 @@ import actions
 import collector
 import exit_file_watcher
 import high_usage_watcher
-import integrations
 import logdb
 import permissions
 import statusdb
@@ -76,15 +75,21 @@ def run(args):
 
         # For each user, add information and evaluate them
         # .copy() -> we delete user objects while iterating; not a deep copy
+        statusdb_batch = statusdb.StatusDBWriteBatch(statusdb_obj)
         for user_obj in users.copy().values():
             if user_obj.new():
                 new_user_actions(user_obj, initial_badness, statusdb_obj)
 
             should_delete = evaluate_user(user_obj, statusdb_obj, logdb_obj,
-                                          args.sudo_permissions)
+                                          args.sudo_permissions,
+                                          statusdb_batch)
             if should_delete:
                 collector_obj.delete_user(user_obj.uid)
 
+        # Write out the status changes from evaluating users in bulk. This
+        # must happen before syncing statuses, which reads them back.
+        statusdb_batch.flush()
+
         # Watch for high usage (overall, not user-specific) on the node,
         # apply before sync so that the per-user quotas we show are reflective
         # of the current state
@@ -155,13 +160,14 @@ def sync_statuses(users, statusdb_obj):
         if repl_hostname == sysinfo.hostname:
             continue
 
-        username = "{} ({})".format(*integrations._get_name(uid))
+        username = triggers.service_username(uid)
         service_logger.info("User %s's status on %s was synced from %s",
                             username, sysinfo.hostname,
                             repl_hostname)
 
 
-def evaluate_user(user_obj, statusdb_obj, logdb_obj, sudoers):
+def evaluate_user(user_obj, statusdb_obj, logdb_obj, sudoers,
+                  statusdb_batch=None):
     """
     Evaluates a user based on their usage and takes the appropriate actions.
     Returns whether the user should be deleted.
@@ -174,6 +180,8 @@ def evaluate_user(user_obj, statusdb_obj, logdb_obj, sudoers):
         A LogDB object to use.
     sudoers: bool
         Whether to use sudoer permissions.
+    statusdb_batch: statusdb.StatusDBWriteBatch
+        An optional batch to add the user's status updates to.
     """
     if not cfg.general.debug_mode and user_obj.cgroup.active():
         if sudoers:
@@ -186,7 +194,7 @@ def evaluate_user(user_obj, statusdb_obj, logdb_obj, sudoers):
         return True
 
     user_obj.update_badness_from_last_usage()
-    triggers.evaluate(user_obj, statusdb_obj, logdb_obj)
+    triggers.evaluate(user_obj, statusdb_obj, logdb_obj, statusdb_batch)
     return False
 
 
@@ -221,13 +221,11 @@ class StaticProcess(usage.Usage, Process):
         Initializes a static Process.
         """
         Process.__init__(self, pid)
-        super().__init__()
         self.name = "unknown"
         self.uptime = -1
         self.owner = -1
         self.count = 1
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+        super().__init__(**kwargs)
 
     def __repr__(self):
         return "<{} {}: {}>".format(type(self).__name__, self.pid, self.name)
@@ -406,7 +404,7 @@ class ProcessInstance(Process):
                     "cpu": max(
                         max(other.cputime - self.cputime, 0) /
                         max(abs(other.clockticks - self.clockticks), 1) *
-                        os.cpu_count(), 0) * 100,
+                        sysinfo.cpu_count, 0) * 100,
                     "mem": (
                         (other.memory_bytes + self.memory_bytes) / 2
                         / sysinfo.total_mem
@@ -434,3 +432,19 @@ def combo_procs_by_name(procs):
     for proc in procs:
         new_procs[proc.name] += proc
     return list(new_procs.values())
+
+
+def sum_usage(procs):
+    """
+    Returns the total cpu and memory usage of the given processes as a tuple.
+    Unlike sum(), this doesn't create a new StaticProcess() for every process
+    added.
+
+    procs: iter
+        A iterable of static processes.
+    """
+    cpu_total = mem_total = 0.0
+    for proc in procs:
+        cpu_total += proc.usage["cpu"]
+        mem_total += proc.usage["mem"]
+    return cpu_total, mem_total
@@ -2,7 +2,6 @@
 #
 # SPDX-License-Identifier: GPL-2.0-only
 
-import copy
 import datetime
 import itertools
 import logging
@@ -112,14 +111,12 @@ def events_to_metric_lists(events, cpu_quota, mem_quota):
         for event, procs in events.items()
     }
     all_procs = set(itertools.chain.from_iterable(combo_events.values()))
-    event_mold = [0.0] * len(combo_events.keys())
+    num_events = len(combo_events)
 
-    # Create dict of processes, with values being usage at every event
-    proc_cpu_events = {
-        proc.name: copy.deepcopy(event_mold)
-        for proc in all_procs
-    }
-    proc_mem_events = copy.deepcopy(proc_cpu_events)
+    # Create dict of processes, with values being usage at every event. The
+    # usage is all floats, so new lists can be made rather than deep copies.
+    proc_cpu_events = {proc.name: [0.0] * num_events for proc in all_procs}
+    proc_mem_events = {proc.name: [0.0] * num_events for proc in all_procs}
     for i, event in enumerate(combo_events):
         for proc in combo_events[event]:
             # Update usage for this event
@@ -756,6 +756,94 @@ class StatusDBCleaner:
             logger.debug("Failed to cleanup statusdb; will try again: %s", err)
 
 
+class StatusDBWriteBatch:
+    """
+    Collects individual status and badness updates to statusdb so that they
+    can be written out together in bulk, rather than with a database
+    transaction for every update.
+    """
+
+    def __init__(self, statusdb_obj):
+        """
+        Initializes the batch.
+
+        statusdb_obj: statusdb.StatusDB
+            The StatusDB object to write out the updates to.
+        """
+        self.statusdb_obj = statusdb_obj
+        self.statuses = {}
+        self.badness = {}
+
+    def set_status(self, uid, new_status):
+        """
+        Sets the user's status in statusdb when the batch is flushed. Replaces
+        any previous status set for the user in the batch.
+
+        uid: int
+            The user's uid.
+        new_status: statuses.Status()
+            The new status of the user.
+        """
+        self.statuses[uid] = new_status
+
+    def set_badness(self, uid, badness_obj):
+        """
+        Sets the user's badness in statusdb when the batch is flushed.
+        Replaces any previous badness set for the user in the batch.
+
+        uid: int
+            The user's uid.
+        badness_obj: badness.Badness()
+            The user's corresponding badness object to set.
+        """
+        self.badness[uid] = badness_obj
+
+    def flush(self):
+        """
+        Writes out the collected statuses and badness to statusdb and empties
+        the batch. If a bulk write fails, the updates are written out one user
+        at a time instead, so that a single bad update doesn't drop everyone
+        else's. Failures are logged rather than raised.
+        """
+        user_statuses, self.statuses = self.statuses, {}
+        user_badness, self.badness = self.badness, {}
+        if user_statuses:
+            self._write(self.statusdb_obj.write_status,
+                        self.statusdb_obj.set_status, user_statuses, "status")
+        if user_badness:
+            self._write(self.statusdb_obj.write_badness,
+                        self.statusdb_obj.set_badness, user_badness, "badness")
+
+    @staticmethod
+    def _write(write_all, write_one, updates, name):
+        """
+        Writes out the updates with write_all(), falling back to write_one()
+        for each user if that fails.
+
+        write_all: func
+            A function that takes a dictionary of uids to updates.
+        write_one: func
+            A function that takes a uid and its update.
+        updates: dict
+            A dictionary of uids to updates.
+        name: str
+            What is being updated, for logging.
+        """
+        try:
+            write_all(updates)
+            return
+        except common_db_errors as err:
+            logger.warning("Failed to bulk update %s in statusdb, updating "
+                           "users individually: %s", name, err)
+
+        for uid, update in updates.items():
+            try:
+                write_one(uid, update)
+            except common_db_errors as err:
+                logger.debug("Failed to update the user's new %s in statusdb "
+                             "for %s: %s", name, uid, err)
+
+
 def lookup_tablenames():
     """
     Returns the configured status and badness tablenames.
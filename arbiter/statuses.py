@@ -5,16 +5,26 @@
 """
 Methods related to getting status information.
 """
-import datetime
+import functools
 import logging
 import time
 import types
 
 import sysinfo
-from cfgparser import cfg, Configuration
+from cfgparser import cfg, Configuration, on_load
 
 logger = logging.getLogger("arbiter." + __name__)
 
+# Configuration values that are looked up for every user each arbiter
+# interval. These are flattened out of cfg whenever it is loaded (see
+# cache_cfg_values()) to avoid walking the nested configuration each time.
+occur_timeout = 0
+refresh_offset = 0
+relative_quotas = False
+div_cpu_quotas_by_threads = False
+# Timeout in seconds of each penalty status group, identified by name
+penalty_timeouts = {}
+
 
 class Status(types.SimpleNamespace):
     """
@@ -115,22 +125,9 @@ class Status(types.SimpleNamespace):
             Whether or not to return the quotas of the default status group,
             rather than the default.
         """
-        current_status_group = self.default if default else self.current
-        default_status_group = self.default
-        status_prop = lookup_status_prop(current_status_group)
-        quotas = [
-            status_prop.cpu_quota,
-            status_prop.mem_quota / sysinfo.bytes_to_gb(sysinfo.total_mem) * 100
-        ]
-        if cfg.status.div_cpu_quotas_by_threads_per_core:
-            quotas[0] /= sysinfo.threads_per_core
-
-        rel_quotas = cfg.status.penalty.relative_quotas
-        if not default and self.in_penalty() and rel_quotas:
-            default_prop = lookup_status_prop(default_status_group)
-            quotas[0] = quotas[0] * default_prop.cpu_quota
-            quotas[1] = quotas[1] * default_prop.mem_quota
-        return quotas
+        if default:
+            return lookup_quotas(self.default)
+        return lookup_quotas(self.current, self.default)
 
     def has_occurrences(self):
         """
@@ -158,12 +155,17 @@ class Status(types.SimpleNamespace):
         """
         self.occur_timestamp = int(time.time())
 
-    def occurrences_expired(self):
+    def occurrences_expired(self, now=None):
         """
         Returns whether the timeout on occurrences has expired.
+
+        now: float
+            An optional epoch timestamp to compare against. Defaults to the
+            current time.
         """
-        timeout = cfg.status.penalty.occur_timeout
-        return self.occur_timestamp + timeout < time.time()
+        if now is None:
+            now = time.time()
+        return self.occur_timestamp + occur_timeout < now
 
     def penalty_index(self):
         """
@@ -181,16 +183,20 @@ class Status(types.SimpleNamespace):
         Returns the configured timeout in seconds for the penalty. If the
         current status group is not a penalty, returns 0.
         """
-        if self.in_penalty():
-            return lookup_status_prop(self.current).timeout
-        return 0
+        return penalty_timeouts.get(self.current, 0)
 
-    def penalty_expired(self):
+    def penalty_expired(self, now=None):
         """
         Returns whether the timeout on the penalty has expired. If the current
         status group is not penalty returns false.
+
+        now: float
+            An optional epoch timestamp to compare against. Defaults to the
+            current time.
         """
-        return self.timestamp + self.penalty_timeout() < time.time()
+        if now is None:
+            now = time.time()
+        return self.timestamp + self.penalty_timeout() < now
 
     def downgrade_penalty(self):
         """
@@ -381,22 +387,12 @@ class Status(types.SimpleNamespace):
         )
 
     def __str__(self):
-        iso_ts = ""
-        if self.timestamp != 0:
-            epoch_ts_dt = datetime.datetime.fromtimestamp(self.timestamp)
-            iso_ts = datetime.datetime.isoformat(epoch_ts_dt)
-
-        iso_occur_ts = ""
-        if self.occur_timestamp != 0:
-            epoch_occur_ts_dt = datetime.datetime.fromtimestamp(self.occur_timestamp)
-            iso_occur_ts = datetime.datetime.isoformat(epoch_occur_ts_dt)
-
         return "Status({}/{}, occur={}, ts={}, occur_ts={}, authority={})".format(
             self.current,
             self.default,
             self.occurrences,
-            iso_ts,
-            iso_occur_ts,
+            _iso_timestamp(self.timestamp),
+            _iso_timestamp(self.occur_timestamp),
             self.authority
         )
 
@@ -408,10 +404,25 @@ class Status(types.SimpleNamespace):
         """
         self.current = new_status_group
         self.occurrences = 0
-        self.timestamp = int(time.time() + (2 * cfg.general.arbiter_refresh))
+        self.timestamp = int(time.time() + refresh_offset)
         self.occur_timestamp = self.timestamp
 
 
+def _iso_timestamp(timestamp):
+    """
+    Returns the epoch timestamp as a local ISO 8601 string, or a empty string
+    if the timestamp is unset (0). This is a cheaper equivalent of
+    datetime.datetime.fromtimestamp(timestamp).isoformat() for the whole
+    second timestamps used in statuses.
+    """
+    if timestamp == 0:
+        return ""
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(timestamp))
+
+
+# There are only a handful of status groups, so these lookups are cached
+# (and cleared whenever a configuration is loaded)
+@functools.lru_cache(maxsize=64)
 def lookup_is_penalty(status_group):
     """
     Returns whether the status group is a penalty status group.
@@ -419,6 +430,7 @@ def lookup_is_penalty(status_group):
     return status_group in cfg.status.penalty.order
 
 
+@functools.lru_cache(maxsize=64)
 def lookup_status_prop(status_group):
     """
     Looks up the status group properties from the config, and returns the
@@ -434,19 +446,62 @@ def lookup_status_prop(status_group):
     return getattr(context, status_group, Configuration({}))
 
 
+@functools.lru_cache(maxsize=64)
+def lookup_quotas(status_group, default_status_group=None):
+    """
+    Returns the quotas of the status group as a pct of the machine. If a
+    default status group is given and the status group is a penalty status
+    group with relative quotas, the quotas are relative to the default status
+    group's quotas.
+
+    status_group: str
+        The status group to get the quotas of.
+    default_status_group: str, None
+        The user's default status group.
+    """
+    status_prop = lookup_status_prop(status_group)
+    quotas = [
+        status_prop.cpu_quota,
+        status_prop.mem_quota / sysinfo.bytes_to_gb(sysinfo.total_mem) * 100
+    ]
+    if div_cpu_quotas_by_threads:
+        quotas[0] /= sysinfo.threads_per_core
+
+    if (default_status_group and lookup_is_penalty(status_group) and
+            relative_quotas):
+        default_prop = lookup_status_prop(default_status_group)
+        quotas[0] = quotas[0] * default_prop.cpu_quota
+        quotas[1] = quotas[1] * default_prop.mem_quota
+    return tuple(quotas)
+
+
 def lookup_default_status_group(uid):
     """
     Looks up the default status group of the user, matching in the order a
     status group appears in config. The fallback status group specified
-    in config will be returned if the user doesn't match any groups.
+    in config will be returned if the user doesn't match any groups. Lookups
+    are cached for a period of time since group membership rarely changes.
 
     uid: int
         The user's uid.
     """
     # Cast types to make sure arguments are integers
-    uid = int(uid)
-    gids = sysinfo.query_gids(uid)
+    return _match_default_status_group(int(uid))
 
+
+# Matching a default status group requires querying the user's groups
+# (possibly over the network), but is done every time a status is read from
+# statusdb
+@sysinfo.timed_lru_cache(maxsize=4096)
+def _match_default_status_group(uid):
+    """
+    Returns the first configured status group that the user belongs to, or
+    the fallback status group if the user doesn't match any groups.
+
+    uid: int
+        The user's uid.
+    """
+    gids = sysinfo.query_gids(uid)
     for status_group in cfg.status.order:
         status_prop = lookup_status_prop(status_group)
         if uid in status_prop.uids or any(gid in status_prop.gids for gid in gids):
@@ -465,3 +520,30 @@ def lookup_empty_status(uid):
     """
     default_status_group = lookup_default_status_group(uid)
     return Status(default_status_group, default_status_group, 0, 0, 0)
+
+
+def cache_cfg_values():
+    """
+    Caches frequently used configuration values as module globals. This is
+    called every time a configuration is loaded.
+    """
+    global occur_timeout, refresh_offset, relative_quotas
+    global div_cpu_quotas_by_threads
+    occur_timeout = cfg.status.penalty.occur_timeout
+    # Status overrides are set slightly into the future; see
+    # Status.override_status_group()
+    refresh_offset = 2 * cfg.general.arbiter_refresh
+    relative_quotas = cfg.status.penalty.relative_quotas
+    div_cpu_quotas_by_threads = cfg.status.div_cpu_quotas_by_threads_per_core
+    penalty_timeouts.clear()
+    for status_group in cfg.status.penalty.order:
+        status_prop = getattr(cfg.status.penalty, status_group)
+        penalty_timeouts[status_group] = status_prop.timeout
+    # The configured status groups may have changed
+    _match_default_status_group.cache_clear()
+    lookup_is_penalty.cache_clear()
+    lookup_status_prop.cache_clear()
+    lookup_quotas.cache_clear()
+
+
+on_load(cache_cfg_values)
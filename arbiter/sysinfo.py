@@ -9,6 +9,7 @@ A bunch of helper functions and values that retrieve/have "system"
 information, taken broadly.
 """
 
+import functools
 import os
 import pwd
 import re
@@ -72,6 +73,9 @@ def free_swap():
 # Num of clock ticks per second
 clockticks_per_sec = os.sysconf(2)
 
+# Num of cpus (threads) on the machine
+cpu_count = os.cpu_count()
+
 # Total Memory in bytes
 total_mem = proc_meminfo("MemTotal") * 1024
 
@@ -133,6 +137,10 @@ def passwd_entry(uid):
         return False
 
 
+# How long lookups of users (e.g. passwd entries) are cached for, since they
+# rarely change
+user_lookup_timeout = 60 * 30  # 30m
+
 # Cache passwd records for quick lookup
 passwd_cache = {}
 
@@ -144,10 +152,9 @@ def getpwuid_cached(uid):
           pwd.getpwuid() will raise a KeyError in that case and thus,
           this function will too.
     """
-    cache_timeout = 60 * 30  # 30m
     if uid in passwd_cache:
         ts, passwd = passwd_cache[uid]
-        if time.time() - ts < cache_timeout:
+        if time.time() - ts < user_lookup_timeout:
             return passwd
         passwd_cache.pop(uid)
 
@@ -156,6 +163,34 @@ def getpwuid_cached(uid):
     return passwd
 
 
+def timed_lru_cache(maxsize=128, timeout=user_lookup_timeout):
+    """
+    A decorator like functools.lru_cache(maxsize) whose cached values also
+    expire. Time is split into periods of the timeout and values are only
+    reused within the same period, so a value is cached for at most timeout
+    seconds. Values from earlier periods are never used again and are
+    evicted like any other least recently used value. The decorated function
+    has a cache_clear() to clear the cache.
+
+    maxsize: int
+        The maximum number of values to cache.
+    timeout: int
+        The most seconds a value is cached for.
+    """
+    def decorator(func):
+        @functools.lru_cache(maxsize=maxsize)
+        def cached_func(period, *args):
+            return func(*args)
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            return cached_func(int(time.time() // timeout), *args)
+
+        wrapper.cache_clear = cached_func.cache_clear
+        return wrapper
+    return decorator
+
+
 # Cache this lookup, we use it heavily and plus this ensures the hostname is
 # safe against it changing from under us.
 hostname = socket.gethostname()
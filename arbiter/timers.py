@@ -9,40 +9,55 @@ A module containing helper objects for various timers.
 import time
 import datetime
 
+# time.monotonic_ns() was added in Python 3.7
+monotonic_ns = getattr(time, "monotonic_ns", lambda: int(time.monotonic() * 1e9))
+
 
 class TimeRecorder:
     """
-    Accurately record changes in time.
+    Accurately record changes in time. Time is tracked internally as integer
+    nanoseconds so that checking whether the recorder has expired is an
+    integer comparison.
     """
 
     def __init__(self):
-        self.start_time = time.monotonic()
-        self.waittime = 0
+        self.start_time = monotonic_ns()
+        self.waittime_ns = 0
 
     def start_now(self, waittime):
         """
         Starts the time recorder.
+
+        waittime: int, float
+            How long to wait in seconds.
         """
-        self.waittime = waittime
-        self.start_time = time.monotonic()
+        self.waittime_ns = int(waittime * 1e9)
+        self.start_time = monotonic_ns()
+
+    @property
+    def waittime(self):
+        """
+        Returns how long the recorder waits in seconds.
+        """
+        return self.waittime_ns / 1e9
 
     def expired(self):
         """
         Returns whether there is any time left.
         """
-        return self.delta() <= 0
+        return monotonic_ns() - self.start_time >= self.waittime_ns
 
     def delta(self):
         """
-        Returns how much waiting is left.
+        Returns how much waiting is left in seconds.
         """
-        return self.waittime - self.time_since_start()
+        return (self.waittime_ns - (monotonic_ns() - self.start_time)) / 1e9
 
     def time_since_start(self):
         """
-        Returns the amount of time since the start time.
+        Returns the amount of time since the start time in seconds.
         """
-        return time.monotonic() - self.start_time
+        return (monotonic_ns() - self.start_time) / 1e9
 
 
 class DateRecorder:
@@ -21,7 +21,7 @@ logger = logging.getLogger("arbiter." + __name__)
 service_logger = logging.getLogger("arbiter_service")
 
 
-def evaluate(user_obj, statusdb_obj, logdb_obj):
+def evaluate(user_obj, statusdb_obj, logdb_obj, statusdb_batch=None):
     """
     When run, checks the specified triggers and takes the specified action
     associated.
@@ -32,38 +32,66 @@ def evaluate(user_obj, statusdb_obj, logdb_obj):
         A StatusDB object to use.
     logdb_obj: logdb.LogDB
         A LogDB object to use.
+    statusdb_batch: statusdb.StatusDBWriteBatch
+        An optional batch to add status updates to, rather than writing them
+        to statusdb immediately. Penalty upgrades are always written out
+        immediately.
     """
-    username = "{} ({})".format(*integrations._get_name(user_obj.uid))
-
-    if user_obj.status.in_penalty():
-        logger.debug("%s has status: %s", user_obj.uid_name, user_obj.status)
+    status = user_obj.status
+    # Most users are in their default status with no badness or occurrences,
+    # in which case there is nothing to evaluate
+    if (status.current == status.default and status.occurrences == 0 and
+            user_obj.badness_obj.is_good()):
+        return
+
+    statusdb_writer = statusdb_batch if statusdb_batch else statusdb_obj
+    # Use a single time for all the comparisons so they are consistent
+    now = time.time()
+    in_penalty = status.in_penalty()
+    if in_penalty:
+        logger.debug("%s has status: %s", user_obj.uid_name, status)
 
     # Only evaluate users who are not in penalty
-    if not user_obj.status.in_penalty():
+    if not in_penalty:
 
         # We found ourseleves a violation!
         if user_obj.badness_obj.is_violation():
-            upgrade_penalty(user_obj, username, statusdb_obj, logdb_obj)
+            upgrade_penalty(user_obj, service_username(user_obj.uid),
+                            statusdb_obj, logdb_obj)
 
         # If the user is being bad, no violation just yet
         elif user_obj.badness_obj.is_bad():
+            username = service_username(user_obj.uid)
             log_user_badness(user_obj, username)
-            if user_obj.status.has_occurrences():
-                reset_occurrences_timeout(user_obj, username, statusdb_obj)
+            if status.has_occurrences():
+                reset_occurrences_timeout(user_obj, username, statusdb_writer)
 
         # The user is being good and occurrences has timed out
-        elif user_obj.status.has_occurrences() and user_obj.status.occurrences_expired():
-            lower_occurrences(user_obj, username, statusdb_obj)
+        elif status.has_occurrences() and status.occurrences_expired(now):
+            lower_occurrences(user_obj, service_username(user_obj.uid),
+                              statusdb_writer)
 
     # Lower status for bad users past a certain time
-    elif user_obj.status.penalty_expired():
-        downgrade_penalty(user_obj, username, statusdb_obj)
+    elif status.penalty_expired(now):
+        downgrade_penalty(user_obj, service_username(user_obj.uid),
+                          statusdb_writer)
 
     # If their in penalty, but haven't been released
     else:
-        timeleft = int(time.time()) - user_obj.status.timestamp
+        timeleft = int(now) - status.timestamp
         logger.debug("%s has spent: %s seconds in penalty of a required %s",
-                     user_obj.uid_name, timeleft, user_obj.status.penalty_timeout())
+                     user_obj.uid_name, timeleft, status.penalty_timeout())
+
+
+def service_username(uid):
+    """
+    Returns the user's username and real name formatted for the service log.
+    The passwd lookup is cached (see sysinfo.getpwuid_cached()).
+
+    uid: int
+        The user's uid.
+    """
+    return "{} ({})".format(*integrations._get_name(uid))
 
 
 def upgrade_penalty(user_obj, username, statusdb_obj, logdb_obj):
@@ -123,11 +151,14 @@ def log_user_badness(user_obj, username):
     username: str
         The user's username.
     """
-    logger.debug("%s has nonzero badness: %s", user_obj.uid_name,
-                 user_obj.badness_obj)
     service_logger.info("User %s has nonzero badness: %s", username,
                         user_obj.badness_obj.score())
 
+    # The usage is only computed to be logged, so skip it if it won't be
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug("%s has nonzero badness: %s", user_obj.uid_name,
+                 user_obj.badness_obj)
     whlist_cpu_usage, whlist_mem_usage = user_obj.last_proc_usage(whitelisted=True)
     logger.debug("Whitelisted Usage: cpu %s, mem %s", whlist_cpu_usage,
                  whlist_mem_usage)
@@ -144,8 +175,8 @@ def reset_occurrences_timeout(user_obj, username, statusdb_obj):
         The user to update in statusdb.
     username: str
         The user's username.
-    statusdb_obj: statusdb.StatusDB
-        A StatusDB object to use.
+    statusdb_obj: statusdb.StatusDB or statusdb.StatusDBWriteBatch
+        A StatusDB object or a batch of writes to one to use.
     """
     # The user's usage should stay below the threshold in order to
     # for the occurrences timeout to continue.
@@ -164,8 +195,8 @@ def lower_occurrences(user_obj, username, statusdb_obj):
         The user to update in statusdb.
     username: str
         The user's username.
-    statusdb_obj: statusdb.StatusDB
-        A StatusDB object to use.
+    statusdb_obj: statusdb.StatusDB or statusdb.StatusDBWriteBatch
+        A StatusDB object or a batch of writes to one to use.
     """
     user_obj.status.lower_occurrences()
     try_update_statusdb_for_user(user_obj, statusdb_obj)
@@ -182,8 +213,8 @@ def downgrade_penalty(user_obj, username, statusdb_obj):
         The user to update in statusdb.
     username: str
         The user's username.
-    statusdb_obj: statusdb.StatusDB
-        A StatusDB object to use.
+    statusdb_obj: statusdb.StatusDB or statusdb.StatusDBWriteBatch
+        A StatusDB object or a batch of writes to one to use.
     """
     logger.info("Decreasing the penalty status of %s", user_obj.uid_name)
     # When downgrading penalty we make the status authoritative, but we
@@ -223,6 +254,8 @@ def try_update_statusdb_for_user(user_obj, statusdb_obj, include_badness=True):
 
     user_obj: user.User()
         The user to update in statusdb.
+    statusdb_obj: statusdb.StatusDB or statusdb.StatusDBWriteBatch
+        A StatusDB object or a batch of writes to one to use.
     include_badness: bool
         Whether to write out the badness as well as status.
     """
@@ -53,6 +53,14 @@ approach of overriding the all of operators and not using the parent's
 operators.
 """
 
+import itertools
+
+# itertools.pairwise() was added in Python 3.10
+pairwise = getattr(itertools, "pairwise", lambda items: zip(items, items[1:]))
+
+# The zero usage of every Usage() object. This is a template that is copied
+# (copying a small dict is faster than building a new one) and must not be
+# modified; the copies are modified by callers so they have to be dicts.
 metrics = {"cpu": 0.0, "mem": 0.0}
 
 
@@ -65,7 +73,10 @@ class Usage(object):
         """
         Initializes a Usage object.
         """
-        self.usage = metrics.copy()
+        # Most objects are created with their usage, which would replace the
+        # default usage straight away
+        if "usage" not in kwargs:
+            self.usage = metrics.copy()
         for key, value in kwargs.items():
             setattr(self, key, value)
 
@@ -73,82 +84,90 @@ class Usage(object):
         return "<{}: {}>".format(type(self).__name__, self.usage)
 
     def __str__(self):
-        properties = []
-        for prop, value in vars(self).items():
-            properties.append("{}: {}".format(prop, value))
-        return str(type(self).__name__) + " " + ", ".join(properties)
+        return "{} {}".format(type(self).__name__, ", ".join(
+            "{}: {}".format(prop, value) for prop, value in vars(self).items()
+        ))
 
     def __lt__(self, other):
         if isinstance(other, Usage):
-            return sum(self.usage.values()) < sum(other.usage.values())
+            return (self.usage["cpu"] + self.usage["mem"] <
+                    other.usage["cpu"] + other.usage["mem"])
         return super().__lt__(other)
 
     def __le__(self, other):
         if isinstance(other, Usage):
-            return sum(self.usage.values()) <= sum(other.usage.values())
+            return (self.usage["cpu"] + self.usage["mem"] <=
+                    other.usage["cpu"] + other.usage["mem"])
         return super().__le__(other)
 
     def __gt__(self, other):
         if isinstance(other, Usage):
-            return sum(self.usage.values()) > sum(other.usage.values())
+            return (self.usage["cpu"] + self.usage["mem"] >
+                    other.usage["cpu"] + other.usage["mem"])
         return super().__gt__(other)
 
     def __ge__(self, other):
         if isinstance(other, Usage):
-            return sum(self.usage.values()) >= sum(other.usage.values())
+            return (self.usage["cpu"] + self.usage["mem"] >=
+                    other.usage["cpu"] + other.usage["mem"])
         return super().__ge__(other)
 
+    def _with_usage(self, cpu, mem):
+        """
+        Returns a new object of the same type, with the same properties as
+        this one, except with the given cpu and mem usage.
+        """
+        # Copy the properties directly rather than passing them as kwargs
+        # through __init__(), which would set a default usage and then every
+        # property again one at a time
+        cls = type(self)
+        new = cls.__new__(cls)
+        new.__dict__.update(self.__dict__)
+        new.usage = {"cpu": cpu, "mem": mem}
+        return new
+
+    def copy(self):
+        """
+        Returns a copy of this object with its own usage. The other properties
+        are expected to be immutable and are shared with the copy.
+        """
+        return self._with_usage(self.usage["cpu"], self.usage["mem"])
+
     def __add__(self, other):
+        usage = self.usage
         if isinstance(other, type(self)):
-            kwargs = vars(self).copy()
-            kwargs["usage"] = {
-                metric: usage + other.usage[metric]
-                for metric, usage in self.usage.items()
-            }
-            return type(self)(**kwargs)
-        else:
-            kwargs = vars(self).copy()
-            kwargs["usage"] = {
-                metric: usage + other
-                for metric, usage in self.usage.items()
-            }
-            return type(self)(**kwargs)
+            other_usage = other.usage
+            return self._with_usage(usage["cpu"] + other_usage["cpu"],
+                                    usage["mem"] + other_usage["mem"])
+        return self._with_usage(usage["cpu"] + other, usage["mem"] + other)
 
     def __radd__(self, other):
+        # sum() and combo_procs_by_name() start with 0 + obj, which only needs
+        # a copy rather than adding 0 to every metric. It must still be a new
+        # object since callers may modify the result.
+        if other == 0:
+            return self.copy()
         return self.__add__(other)
 
     def __sub__(self, other):
+        usage = self.usage
         if isinstance(other, type(self)):
-            kwargs = vars(self).copy()
-            kwargs["usage"] = {
-                metric: usage - other.usage[metric]
-                for metric, usage in self.usage.items()
-            }
-            return type(self)(**kwargs)
-        else:
-            kwargs = vars(self).copy()
-            kwargs["usage"] = {
-                metric: usage - other
-                for metric, usage in self.usage.items()
-            }
-            return type(self)(**kwargs)
+            other_usage = other.usage
+            return self._with_usage(usage["cpu"] - other_usage["cpu"],
+                                    usage["mem"] - other_usage["mem"])
+        return self._with_usage(usage["cpu"] - other, usage["mem"] - other)
 
     def __rsub__(self, other):
-        return self.__sub__(other)
+        usage = self.usage
+        return self._with_usage(other - usage["cpu"], other - usage["mem"])
 
     def __truediv__(self, other):
-        kwargs = vars(self).copy()
-        kwargs["usage"] = {
-            metric: usage / other for metric, usage in self.usage.items()
-        }
-        return type(self)(**kwargs)
+        usage = self.usage
+        return self._with_usage(usage["cpu"] / other, usage["mem"] / other)
 
     def __floordiv__(self, other):
-        kwargs = vars(self).copy()
-        kwargs["usage"] = {
-            metric: usage // other for metric, usage in self.usage.items()
-        }
-        return type(self)(**kwargs)
+        usage = self.usage
+        return self._with_usage(usage["cpu"] // other, usage["mem"] // other)
 
 
 def combine(*instances):
@@ -160,13 +179,10 @@ def combine(*instances):
     *instances: Instance()
         Instance objects.
     """
-    static_objs = []
-    iter_instances = iter(instances)
-    prev_instance = next(iter_instances)
-    for instance in iter_instances:
-        static_objs.append(prev_instance / instance)
-        prev_instance = instance
-    return static_objs
+    return [
+        prev_instance / instance
+        for prev_instance, instance in pairwise(instances)
+    ]
 
 
 def average(*statics, by=None):
@@ -178,7 +194,10 @@ def average(*statics, by=None):
     divby: None or int
         What to average by. If None, defaults to the length of the usages.
     """
-    return sum(statics) / (by if by else len(statics))
+    # Start the sum with the first object rather than 0 to avoid creating a
+    # copy of it via __radd__(); the objects themselves must still be added
+    # together so that subclasses can combine their metadata (e.g. counts)
+    return sum(statics[1:], statics[0]) / (by if by else len(statics))
 
 
 def rel_sorted(iterable, *quotas, key=None, reverse=False):
@@ -192,7 +211,17 @@ def rel_sorted(iterable, *quotas, key=None, reverse=False):
     >>> rel_sorted(users, cpu_quota, mem_quota, key=get_quotas)
     [user, ..., ...]
     """
-    rel_usage_key = lambda i: _rel_usage(i, *quotas, key=key)
+    if len(quotas) == 2:
+        # The usual case of a pair of usages (e.g. cpu and mem); skip the
+        # checks of _rel_usage() for every item
+        first_quota, second_quota = quotas
+        get_usages = key if key else lambda i: i
+
+        def rel_usage_key(item):
+            usages = get_usages(item)
+            return usages[0] / first_quota + usages[1] / second_quota
+    else:
+        rel_usage_key = lambda i: _rel_usage(i, *quotas, key=key)
     return sorted(
         iterable,
         key=rel_usage_key,
@@ -201,10 +230,9 @@ def rel_sorted(iterable, *quotas, key=None, reverse=False):
 
 
 def _rel_usage(item, *quotas, key=None):
-    iter_quotas = iter(quotas)
     usages = key(item) if key else item
     try:
         iter(usages)
     except TypeError:
         usages = [usages]  # Just in case only one usage is provided
-    return sum(usage / next(iter_quotas) for usage in usages)
+    return sum(usage / quota for usage, quota in zip(usages, quotas))
@@ -7,8 +7,8 @@ A module with utilities for storing information related to a specific user.
 """
 
 import collections
-import copy
 import itertools
+import operator
 import os
 
 import badness
@@ -16,8 +16,33 @@ import cginfo
 import pidinfo
 import statuses
 import sysinfo
-import usage
-from cfgparser import cfg, shared
+from cfgparser import cfg, on_load, shared
+
+
+# Cache of the processes listed in whitelist files, identified by path. The
+# global whitelist file is shared by every status group.
+whitelist_file_cache = {}
+
+
+def read_whitelist_file(path):
+    """
+    Returns the frozenset of processes listed in the whitelist file, one per
+    line. The contents are cached until the file is modified.
+
+    path: str
+        The path to the whitelist file.
+    """
+    mtime = os.stat(path).st_mtime
+    if path in whitelist_file_cache:
+        cached_mtime, processes = whitelist_file_cache[path]
+        if cached_mtime == mtime:
+            return processes
+
+    with open(path, "r") as f:
+        lines = (line.strip() for line in f.read().splitlines())
+        processes = frozenset(filter(None, lines))  # Ignore blank lines
+    whitelist_file_cache[path] = mtime, processes
+    return processes
 
 
 def get_whitelist(status_group):
@@ -37,15 +62,62 @@ def get_whitelist(status_group):
     ]
     for wfile in whlist_files:
         if wfile and os.path.isfile(wfile):
-            with open(wfile, "r") as f:
-                whlist.update(item.strip() for item in f.readlines())
+            whlist.update(read_whitelist_file(wfile))
     return whlist
 
 
-proc_owner_whitelist = set(cfg.processes.proc_owner_whitelist)
+# The whitelisted process owners and the whitelist of each status group,
+# identified by name. These are shared by all users (see
+# status_group_whitelist()).
+proc_owner_whitelist = frozenset()
 whitelist = {}
-for status_group in cfg.status.order + cfg.status.penalty.order:
-    whitelist[status_group] = get_whitelist(status_group)
+
+
+def status_group_whitelist(status_group):
+    """
+    Returns the whitelist of the status group as a frozenset. The whitelist is
+    built the first time it is needed and is kept until a configuration is
+    loaded.
+
+    status_group: str
+        The name of the status group.
+    """
+    if status_group not in whitelist:
+        whitelist[status_group] = frozenset(get_whitelist(status_group))
+    return whitelist[status_group]
+
+
+def cache_whitelists():
+    """
+    Caches the whitelisted process owners from the configuration and clears
+    the status group whitelists so they are rebuilt from it. This is called
+    every time a configuration is loaded.
+    """
+    global proc_owner_whitelist
+    proc_owner_whitelist = frozenset(cfg.processes.proc_owner_whitelist)
+    whitelist.clear()
+
+
+on_load(cache_whitelists)
+
+# Gets the cgroup cpu and mem usage out of a history event
+event_cgroup_usage = operator.itemgetter("cpu", "mem")
+
+
+def copy_event(event):
+    """
+    Returns a copy of the history event, with copies of its processes. This
+    is much faster than copy.deepcopy(), since the only mutable values in an
+    event are the event itself, its dict of processes and the processes.
+
+    event: dict
+        A history event (see User).
+    """
+    copied_event = event.copy()
+    copied_event["pids"] = {
+        pid: proc.copy() for pid, proc in event["pids"].items()
+    }
+    return copied_event
 
 
 class User:
@@ -67,7 +139,12 @@ class User:
             {"time": float,
              "mem": float,
              "cpu": float,
-             "pids": {int (pid): pidinfo.StaticProcess()}}
+             "pids": {int (pid): pidinfo.StaticProcess()},
+             "proc_usage": (float, float),
+             "whitelisted_proc_usage": (str, (float, float))}
+        where proc_usage is the total cpu and mem usage of the processes and
+        whitelisted_proc_usage is the status group the whitelisted processes
+        were determined with and their total usage.
     badness_obj: badness.Badness()
         A badness object that scores usage and determines whether a violation
         has occurred.
@@ -81,7 +158,8 @@ class User:
         on their current status group.
     """
     __slots__ = ["uid", "gids", "cgroup", "username", "uid_name", "history",
-                 "badness_obj", "status"]
+                 "badness_obj", "status", "_cgroup_usage_cache",
+                 "_proc_usage_cache"]
 
     def __init__(self, uid):
         """
@@ -104,22 +182,31 @@ class User:
         self.status = statuses.lookup_empty_status(self.uid)
         self.history = collections.deque(maxlen=cfg.badness.max_history_kept)
         self.badness_obj = badness.Badness()
+        # Results of last_cgroup_usage() and last_proc_usage() since the last
+        # usage was added
+        self._cgroup_usage_cache = None
+        self._proc_usage_cache = {}
 
-    def history_iter(self, max_events=None):
+    def history_iter(self, max_events=None, *, copy=False):
         """
-        Iterates over a copy of the user's history. If max_events is given, up
-        to the given number of events is yielded.
+        Iterates over the user's history. If max_events is given, up to the
+        given number of events is yielded. The events must not be modified
+        unless copy is set.
 
         max_events: int
             The maximum number of events to iterate over.
+        copy: bool
+            Whether to yield copies of the events (see copy_event()).
         """
         if not max_events:
             num_events = len(self.history)
         else:
             num_events = min(max_events, len(self.history))
 
-        for event in itertools.islice(self.history, num_events):
-            yield copy.deepcopy(event)
+        events = itertools.islice(self.history, num_events)
+        if copy:
+            events = map(copy_event, events)
+        yield from events
 
     def add_usage(self, collect_timestamp, cgroup_usage, per_process_usage,
                   rhel7_compat=False):
@@ -139,26 +226,33 @@ class User:
             it with the sum of process memory due to it being tainted with
             kernel memory.
         """
-        # Irrational paranoia about dicts and objects being pointers...
-        copied_per_process_usage = copy.deepcopy(per_process_usage)
-        self.history.appendleft({
+        self._cgroup_usage_cache = None
+        self._proc_usage_cache.clear()
+        # The processes are new every collection and only belong to this
+        # user, but the dict is copied since "other processes" is added to it
+        copied_per_process_usage = dict(per_process_usage)
+        # Keep a reference to the new event rather than indexing the history
+        # every time it is filled in below
+        event = {
             "time": collect_timestamp,
             "cpu": cgroup_usage.usage["cpu"],
             "mem": cgroup_usage.usage["mem"],
             "pids": copied_per_process_usage
-        })
+        }
+        self.history.appendleft(event)
 
-        summed_proc = pidinfo.StaticProcess(-1)  # Basically zero usage
-        if len(copied_per_process_usage) > 0:
-            # StaticProcess objects can be arbitrarily added together; usage
-            # is added, resulting combined metadata has no inutuitive meaning
-            summed_proc = sum(self.history[0]["pids"].values())
+        # The total usage of the collected processes (zero if there are none)
+        proc_cpu_usage, proc_mem_usage = pidinfo.sum_usage(
+            copied_per_process_usage.values()
+        )
 
         if rhel7_compat:
-            self.history[0]["mem"] = summed_proc.usage["mem"]
+            event["mem"] = proc_mem_usage
 
         # Add a mark ('*') to the end of all whitelisted process names
-        self.mark_whitelisted_processes(self.history[0]["pids"].values())
+        whitelisted_procs = self.mark_whitelisted_processes(
+            event["pids"].values()
+        )
 
         # Add "other processes", our notion of what we don't know: the
         # difference between cgroup usage (accurate) and process usage (not
@@ -168,15 +262,30 @@ class User:
         # *this is particularly relevent for whitelisting of compilers since
         # there are lots of short high usage processes which cannot be
         # identified easily
-        self.history[0]["pids"][-1] = pidinfo.StaticProcess(
+        other_proc = pidinfo.StaticProcess(
             -1,
             usage={
-                "cpu": max(self.history[0]["cpu"] - summed_proc.usage["cpu"], 0),
-                "mem": max(self.history[0]["mem"] - summed_proc.usage["mem"], 0)
+                "cpu": max(event["cpu"] - proc_cpu_usage, 0),
+                "mem": max(event["mem"] - proc_mem_usage, 0)
             },
             name=shared.other_processes_label + "**",
             owner=self.uid
         )
+        event["pids"][-1] = other_proc
+        # Only "other processes" hasn't been checked against the whitelist
+        whitelisted_procs.extend(self.whitelisted_processes([other_proc]))
+
+        # Keep the total usage of the processes so it isn't summed up again
+        # every time the event is averaged over. The whitelisted processes
+        # depend on the status group, so note which one the total is for.
+        event["proc_usage"] = (
+            proc_cpu_usage + other_proc.usage["cpu"],
+            proc_mem_usage + other_proc.usage["mem"]
+        )
+        event["whitelisted_proc_usage"] = (
+            self.status.current,
+            pidinfo.sum_usage(whitelisted_procs)
+        )
 
     def update_badness_from_last_usage(self):
         """
@@ -214,63 +323,88 @@ class User:
         processes: iter
             A iterable of processes.
         """
+        # Bind the whitelists locally since they're checked for every process
+        status_whitelist = status_group_whitelist(self.status.current)
+        owner_whitelist = proc_owner_whitelist
         return [
             proc for proc in processes
-            if proc.name.rstrip("*") in whitelist[self.status.current] or
-               proc.owner in proc_owner_whitelist
+            if proc.name.rstrip("*") in status_whitelist or
+               proc.owner in owner_whitelist
         ]
 
     def mark_whitelisted_processes(self, processes):
         """
         Marks the given StaticProcess()s with a asterisk at the end of their
         name if the process is whitelisted either by the global whitelist,
-        status whitelist or pid owner whitelist.
+        status whitelist or pid owner whitelist. Returns the list of
+        whitelisted processes.
         """
         whitelisted_procs = self.whitelisted_processes(processes)
         for proc in whitelisted_procs:
             proc.name += "*"
+        return whitelisted_procs
 
     def last_cgroup_usage(self):
         """
         Returns the current average cgroup usage between the arbiter
-        intervals.
+        intervals. The result is cached until new usage is added.
         """
+        if self._cgroup_usage_cache is not None:
+            return self._cgroup_usage_cache
+        if not self.history:
+            return 0.0, 0.0
+
         updates = cfg.general.history_per_refresh
-        cpu_usages = [
-            event["cpu"]
-            for event in itertools.islice(self.history, 0, updates)
-        ]
-        mem_usages = [
-            event["mem"]
-            for event in itertools.islice(self.history, 0, updates)
-        ]
-        return (
-            sum(cpu_usages) / len(cpu_usages) if cpu_usages else 0.0,
-            sum(mem_usages) / len(mem_usages) if mem_usages else 0.0
-        )
+        cpu_total = mem_total = 0.0
+        events = 0
+        recent_events = itertools.islice(self.history, 0, updates)
+        for cpu_usage, mem_usage in map(event_cgroup_usage, recent_events):
+            cpu_total += cpu_usage
+            mem_total += mem_usage
+            events += 1
+
+        self._cgroup_usage_cache = (cpu_total / events, mem_total / events)
+        return self._cgroup_usage_cache
 
     def last_proc_usage(self, whitelisted=False):
         """
         Returns the current average total process usage between the arbiter
-        intervals.
+        intervals. The result is cached until new usage is added.
 
         whitelisted: bool
             Whether to only count whitelisted processes.
         """
+        # The whitelist depends on the status group, which may change
+        cache_key = (whitelisted, self.status.current)
+        if cache_key in self._proc_usage_cache:
+            return self._proc_usage_cache[cache_key]
+        if not self.history:
+            return 0.0, 0.0
+
         updates = cfg.general.history_per_refresh
-        total_procs = []
+        cpu_total = mem_total = 0.0
+        events = 0
         for event in itertools.islice(self.history, 0, updates):
-            if whitelisted:
-                procs = self.whitelisted_processes(event["pids"].values())
+            if not whitelisted:
+                cpu_usage, mem_usage = event["proc_usage"]
             else:
-                procs = list(event["pids"].values())
-            total_procs.append(sum(procs))
-
-        if not total_procs:
-            return 0.0, 0.0
-
-        avg_proc = usage.average(*total_procs)
-        return avg_proc.usage["cpu"], avg_proc.usage["mem"]
+                status_group, (cpu_usage, mem_usage) = event["whitelisted_proc_usage"]
+                if status_group != self.status.current:
+                    # The status group has changed since the total was kept;
+                    # keep the new one so later refreshes can use it
+                    cpu_usage, mem_usage = pidinfo.sum_usage(
+                        self.whitelisted_processes(event["pids"].values())
+                    )
+                    event["whitelisted_proc_usage"] = (
+                        self.status.current, (cpu_usage, mem_usage)
+                    )
+            cpu_total += cpu_usage
+            mem_total += mem_usage
+            events += 1
+
+        proc_usage = (cpu_total / events, mem_total / events)
+        self._proc_usage_cache[cache_key] = proc_usage
+        return proc_usage
 
     @property
     def cpu_usage(self):
@@ -319,10 +453,10 @@ class User:
         """
         Returns whether the user should continued to be tracked.
         """
-        has_occurrences = self.status.occurrences > 0
+        # Check the user's state before the cgroup, which has to be stat()ed
         return (
-            self.cgroup.active()
-            or self.badness_obj.is_bad()
+            self.badness_obj.is_bad()
             or self.status.in_penalty()
-            or has_occurrences
+            or self.status.occurrences > 0
+            or self.cgroup.active()
         )
@@ -1,8 +1,11 @@
 from cfgparser import cfg
-import pwd
 import os
 import collections
+import functools
+import heapq
 import logging
+import re
+import sysinfo
 
 """
 A module used for integrating a specific site into Arbiter.
@@ -10,6 +13,53 @@ A module used for integrating a specific site into Arbiter.
 
 logger = logging.getLogger("arbiter." + __name__)
 
+# Contents of the email templates, identified by path. The templates are read
+# when they are first used or modified rather than every time an email is
+# sent.
+template_cache = {}
+
+# Splits a hostname into its prefix and trailing digits; see
+# format_cluster_hostname_list()
+hostname_digits_re = re.compile("(.*?)([0-9]+)")
+
+# A row of the table of users in the overall high usage email; see
+# overall_high_usage_body()
+high_usage_user_row = """
+            <tr>
+                <td>{} ({})</td>
+                <td>{:0.2f}</td>
+                <td>{:0.2f}</td>
+                <td>{}</td>
+                <td>{:0.2f}</td>
+                <td>{:0.2f}</td>
+            </tr>
+        """
+
+# The metadata of a user; see get_user_metadata()
+UserMetadata = collections.namedtuple("UserMetadata",
+                                      "username realname email_addr")
+
+
+def read_template(path):
+    """
+    Returns the contents of the template file. The contents are cached until
+    the file is modified, so edits are used without restarting arbiter.
+
+    path: str
+        The path to the template file.
+    """
+    stat = os.stat(path)
+    file_id = stat.st_mtime_ns, stat.st_size
+    if path in template_cache:
+        cached_file_id, contents = template_cache[path]
+        if cached_file_id == file_id:
+            return contents
+
+    with open(path, "r") as template:
+        contents = template.read()
+    template_cache[path] = file_id, contents
+    return contents
+
 
 def warning_email_subject(hostname, severity, username, realname):
     """
@@ -42,9 +92,7 @@ def format_cluster_hostname_list(hostnames):
     cluster[1-7]) if the digits are sequential and greater than two in the
     count, or brace expansion (e.g. cluster{1,4,5}) otherwise.
 
-    Assumes cluster names are not prefix substrings of one another and that
-    digits don't have leading 0s. e.g. cannot have both f1 and frisco1 nor
-    frisco001.
+    Assumes digits don't have leading 0s. e.g. cannot have frisco001.
 
     hostnames: iter
         An iterable of string hostnames to format.
@@ -56,23 +104,36 @@ def format_cluster_hostname_list(hostnames):
     >>> format_cluster_hostname_list(["f1", "f3"])
     "f{1,3}"
     """
-    uniq_hostnames = set(hostnames)  # Ensure no duplicates
-    prefixes = {hostname.rstrip("0123456789") for hostname in uniq_hostnames}
+    # The syncing hosts rarely change, so the same hostnames are usually
+    # formatted again for every email
+    return _format_cluster_hostname_list(frozenset(hostnames))  # No duplicates
+
+
+@functools.lru_cache(maxsize=8)
+def _format_cluster_hostname_list(uniq_hostnames):
+    """
+    Returns a formatted string with comma-seperated hostnames; see
+    format_cluster_hostname_list().
 
+    uniq_hostnames: frozenset
+        A set of string hostnames to format.
+    """
     # A cluster is defined by having two or more hostnames with the same
     # prefix with different ending digits
 
     # Map prefixes to a set of trailing digits found in hostnames; clusters
     # will be a subset of the prefixes where > 1 digits
+    hostname_prefixes = {}
     prefix_digits_map = collections.defaultdict(set)
     for hostname in uniq_hostnames:
-        for prefix in prefixes:
-            # Note: Assumes no prefixes are leading substrings of one another
-            if hostname.startswith(prefix):
-                maybe_digits = hostname[len(prefix):]
-                if maybe_digits.isdigit():
-                    # Note: This int() is problematic for formatting with leading zeros
-                    prefix_digits_map[prefix].add(int(maybe_digits))
+        match = hostname_digits_re.fullmatch(hostname)
+        if match:
+            prefix, digits = match.groups()
+            # Note: This int() is problematic for formatting with leading zeros
+            prefix_digits_map[prefix].add(int(digits))
+        else:
+            prefix = hostname
+        hostname_prefixes[hostname] = prefix
 
     # Now we know the cluster names and their corresponding digits
     cluster_digits_map = {
@@ -83,29 +144,30 @@ def format_cluster_hostname_list(hostnames):
     # All the other hostnames that didn't match the cluster criteria
     not_clustered_hostnames = {
         hostname
-        for hostname in uniq_hostnames
-        # Note: Assumes no prefixes are leading substrings of one another
-        if not any(hostname.startswith(cluster) for cluster in cluster_digits_map.keys())
+        for hostname, prefix in hostname_prefixes.items()
+        if prefix not in cluster_digits_map
     }
 
-    formatted_hostnames = []
+    formatted_clusters = []
     for cluster, digits in cluster_digits_map.items():
         min_digit, max_digit = min(digits), max(digits)
         is_sequential = max_digit - min_digit == len(digits)-1  # ok b/c unique digits
         if len(digits) > 2 and is_sequential:
-            formatted_hostnames.append("{}[{}-{}]".format(cluster, min_digit, max_digit))
+            formatted_clusters.append("{}[{}-{}]".format(cluster, min_digit, max_digit))
         else:
             # {{ -> just one '{' with .format()
-            formatted_hostnames.append("{}{{{}}}".format(cluster, ",".join(map(str, sorted(digits)))))
+            formatted_clusters.append("{}{{{}}}".format(cluster, ",".join(map(str, sorted(digits)))))
 
-    formatted_hostnames.extend(not_clustered_hostnames)
-    formatted_hostnames.sort()
-    if len(formatted_hostnames) > 1:
-        return (", ".join(formatted_hostnames[:-1]) +
-                ("," if len(formatted_hostnames) > 2 else "") +  # oxford comma
-                " and " + formatted_hostnames[-1])
-    else:
-        return formatted_hostnames[0]
+    # Sort the clusters by their formatted text rather than their prefix
+    # (e.g. kp-{1,2} comes before kp[1-3]), then merge in the other hostnames
+    formatted_clusters.sort()
+    formatted_hostnames = list(heapq.merge(formatted_clusters,
+                                           sorted(not_clustered_hostnames)))
+    if len(formatted_hostnames) < 2:
+        return "".join(formatted_hostnames)
+    head, last = formatted_hostnames[:-1], formatted_hostnames[-1]
+    oxford_comma = "," if len(head) > 1 else ""
+    return "{}{} and {}".format(", ".join(head), oxford_comma, last)
 
 
 def warning_email_body(proc_table, username, realname, hostname,
@@ -143,9 +205,7 @@ def warning_email_body(proc_table, username, realname, hostname,
         A list of hosts that Arbiter2 is syncing with.
     """
     # Prepare a message body using the template
-    with open("../etc/warning_email_template.txt", "r") as template:
-        message = template.read()
-    message = message.format(
+    message = read_template("../etc/warning_email_template.txt").format(
         username,
         realname,
         hostname,
@@ -200,8 +260,7 @@ def nice_email_body(username, realname, status_group, timestamp):
         A nicely formatted timestamp that indicates when the user started to be
         bad.
     """
-    with open("../etc/nice_email_template.txt", "r") as template:
-        message = template.read()
+    message = read_template("../etc/nice_email_template.txt")
     return message.format(
         username,
         realname,
@@ -250,22 +309,12 @@ def overall_high_usage_body(hostname, iso_timestamp, total_cores,
     top_users: []
         A list of the top user.User() that are using the most of the machine.
     """
-    with open("../etc/overall_high_usage_email_template.txt", "r") as template:
-        message = template.read()
+    message = read_template("../etc/overall_high_usage_email_template.txt")
     # Prepare all the information about users
-    user_text = ""
+    user_rows = []
     for user in top_users:
         username, realname = _get_name(user.uid)
-        user_text += ("""
-            <tr>
-                <td>{} ({})</td>
-                <td>{:0.2f}</td>
-                <td>{:0.2f}</td>
-                <td>{}</td>
-                <td>{:0.2f}</td>
-                <td>{:0.2f}</td>
-            </tr>
-        """).format(
+        user_rows.append(high_usage_user_row.format(
             username,
             realname,
             user.cpu_usage,
@@ -273,7 +322,8 @@ def overall_high_usage_body(hostname, iso_timestamp, total_cores,
             "{}/{}".format(user.status.current, user.status.default),
             user.cpu_quota,
             user.mem_quota
-        )
+        ))
+    user_text = "".join(user_rows)
     one_la, five_la, fifteen_la = os.getloadavg()
     return message.format(
         hostname,
@@ -316,7 +366,8 @@ def email_addr_placeholder(username):
 def _get_name(uid):
     """
     Returns a tuple containing the user's username and real name. If they are
-    not found, a placeholder is returned instead.
+    not found, a placeholder is returned instead. The passwd lookup is cached
+    (see sysinfo.getpwuid_cached()).
 
     uid: int
         The user's uid.
@@ -324,11 +375,13 @@ def _get_name(uid):
     username = "unknown username"
     realname = "unknown real name"
     try:
-        pwd_info = list(pwd.getpwuid(uid))
-        if pwd_info[0].strip() != "":
-            username = pwd_info[0]
-        if pwd_info[4].strip() != "":
-            realname = pwd_info[4].rstrip(",")
+        pwd_info = sysinfo.getpwuid_cached(uid)
+        pw_name, pw_gecos = pwd_info.pw_name, pwd_info.pw_gecos
+        # Ignore names that are only whitespace
+        if pw_name and not pw_name.isspace():
+            username = pw_name
+        if pw_gecos and not pw_gecos.isspace():
+            realname = pw_gecos.rstrip(",")
     except KeyError:
         pass
     return username, realname
@@ -343,17 +396,13 @@ def get_user_metadata(uid):
         The user's uid.
     """
     username, realname = _get_name(uid)
-    UserMetadata = collections.namedtuple("UserMetadata",
-                                          "username realname email_addr")
     email_addr = email_addr_of(username)
     if email_addr is None:  # If lookup fails
-        logger.warning("Could not find the email address of user: {}!".format(
-            uid
-        ))
+        logger.warning("Could not find the email address of user: %s!", uid)
         if "unknown" not in username:  # Check for placeholder
             email_addr = email_addr_placeholder(username)
         else:
             logger.warning("Could not find the username or email address of "
-                           "user: {}! Email to user will not sent!".format(uid))
+                           "user: %s! Email to user will not sent!", uid)
             email_addr = ""
     return UserMetadata(username, realname, email_addr)
@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: Copyright (c) 2019-2020 Center for High Performance Computing <helpdesk@chpc.utah.edu>
+#
+# SPDX-License-Identifier: GPL-2.0-only
+
+"""
+Tests for writing out batches of statusdb updates.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "arbiter"))
+
+import statusdb  # noqa: E402
+
+
+class FakeStatusDB:
+    """
+    A stand-in for statusdb.StatusDB that fails bulk writes and the per-user
+    writes of the given uids.
+    """
+
+    def __init__(self, failing_uids=()):
+        self.failing_uids = set(failing_uids)
+        self.statuses = {}
+        self.badness = {}
+
+    def write_status(self, status_dict):
+        raise RuntimeError("bulk status write failed")
+
+    def write_badness(self, badness_dict):
+        raise RuntimeError("bulk badness write failed")
+
+    def set_status(self, uid, new_status):
+        if uid in self.failing_uids:
+            raise RuntimeError("status write failed")
+        self.statuses[uid] = new_status
+
+    def set_badness(self, uid, badness_obj):
+        if uid in self.failing_uids:
+            raise RuntimeError("badness write failed")
+        self.badness[uid] = badness_obj
+
+
+class TestStatusDBWriteBatch(unittest.TestCase):
+
+    def test_failing_flush_writes_users_individually(self):
+        statusdb_obj = FakeStatusDB(failing_uids={1001})
+        batch = statusdb.StatusDBWriteBatch(statusdb_obj)
+        for uid in (1000, 1001, 1002):
+            batch.set_status(uid, "status{}".format(uid))
+            batch.set_badness(uid, "badness{}".format(uid))
+
+        with self.assertLogs("arbiter.statusdb", level="DEBUG") as logs:
+            batch.flush()
+
+        self.assertEqual(statusdb_obj.statuses,
+                         {1000: "status1000", 1002: "status1002"})
+        self.assertEqual(statusdb_obj.badness,
+                         {1000: "badness1000", 1002: "badness1002"})
+        self.assertEqual(sum("1001" in line for line in logs.output), 2)
+        self.assertEqual(batch.statuses, {})
+        self.assertEqual(batch.badness, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -30,8 +30,21 @@ username = ""
 password = ""
 db = ""
 
+# The number of points to send to InfluxDB per request
+batch_size = 5000
 
-# Cache the results so we don't have to do two lookups for statuses and badness
+# Line protocol points of each measurement; see main(). The tags must be
+# escaped with escape_tag() and the string fields with format_field(). The
+# points are timestamped in seconds.
+status_line = ("arbiter_status,user={},username={},group={},hostname={} "
+               "current={},default={},occurrences={}i,timestamp={}i,"
+               "occur_timestamp={}i {}")
+badness_line = ("arbiter_badness,user={},username={},group={},hostname={} "
+                "cpu={},mem={},timestamp={}i {}")
+
+
+# Cache the results so users are only looked up once if main() is run again
+# (main() itself looks up each user once for both statuses and badness)
 # 4096 penalties is extremely unlikely but no harm with large values here
 @functools.lru_cache(maxsize=4096)
 def get_user_info(uid):
@@ -51,19 +64,48 @@ def get_user_info(uid):
     return username, group
 
 
+# Reuse the client (and its connection) for every write to the same instance
+@functools.lru_cache(maxsize=1)
+def get_client(host, port, username, password, db):
+    """
+    Returns a InfluxDB client for the given instance.
+    """
+    return influxdb.InfluxDBClient(host, port, username, password, db)
+
+
+def escape_tag(value):
+    """
+    Returns the tag value escaped for the InfluxDB line protocol.
+    """
+    return (str(value).replace("\\", "\\\\").replace(" ", "\\ ")
+                      .replace(",", "\\,").replace("=", "\\="))
+
+
+def format_field(value):
+    """
+    Returns the field value formatted for the InfluxDB line protocol.
+    """
+    if isinstance(value, str):
+        return '"{}"'.format(value.replace("\\", "\\\\").replace('"', '\\"'))
+    if isinstance(value, int) and not isinstance(value, bool):
+        return "{}i".format(value)
+    return str(value)
+
+
 def to_influx(
-    json_body,
+    points,
     host=host,
     port=port,
     username=username,
     password=password,
     db=db
 ):
-    """Writes JSON data to an InfluxDB instance
+    """Writes line protocol points to an InfluxDB instance
     """
     try:
-        client = influxdb.InfluxDBClient(host, port, username, password, db)
-        client.write_points(json_body)
+        client = get_client(host, port, username, password, db)
+        client.write_points(points, time_precision="s", batch_size=batch_size,
+                            protocol="line")
     except influxdb.exceptions.InfluxDBClientError as err:
         print("An error occurred in the InfluxDB request: %s" % err)
         sys.exit(1)
@@ -91,79 +133,89 @@ def parse_statusdb_url(args):
 
 
 def main(args):
-    """Reads status databases and formats as JSON
+    """Reads status databases and formats as line protocol points
     """
-    json_body = []
+    points = []
+    # Every point is written with the same time, even though they may be
+    # written in several batches
+    current_time = int(time.time())
     statusdb_url = parse_statusdb_url(args)
     statusdb_obj = statusdb.lookup_statusdb(statusdb_url)
 
-    badness_timeout = cfg.general.arbiter_refresh * 2
+    # Badness that hasn't been updated since this is old
+    min_badness_update_ts = current_time - cfg.general.arbiter_refresh * 2
     try:
         user_hosts_status = statusdb_obj.read_raw_status()
     except statusdb.common_db_errors as err:
         print("Failed to access statusdb:", err)
         sys.exit(1)
 
-    for uid, hosts_status in user_hosts_status.items():
-        user_info = get_user_info(uid)
-        # Skip users with no passwd entry (see collector.refresh_uids)
-        if not user_info:
-            continue
-
-        username, group = user_info
-        for hostname, status in hosts_status.items():
-            json = {
-                "measurement": "arbiter_status",
-                "tags": {
-                    "user": uid,
-                    "username": username,
-                    "group": group,
-                    "hostname": hostname
-                },
-                "fields": {
-                    "current": status.current,
-                    "default": status.default,
-                    "occurrences": status.occurrences,
-                    "timestamp": status.timestamp,
-                    "occur_timestamp": status.occur_timestamp
-                }
-            }
-            json_body.append(json)
-
     try:
         user_badness = statusdb_obj.read_badness()
     except statusdb.common_db_errors as err:
         print("Failed to access statusdb:", err)
         sys.exit(1)
 
-    for uid, badness_obj in user_badness.items():
+    # Look up (and escape) the username and group of each user once for both
+    # measurements. Users with no passwd entry are skipped (see
+    # collector.refresh_uids)
+    user_tags = {}
+    for uid in set(user_hosts_status).union(user_badness):
         user_info = get_user_info(uid)
-        # Skip users with no passwd entry (see collector.refresh_uids)
-        if not user_info:
+        if user_info:
+            user_tags[uid] = tuple(map(escape_tag, user_info))
+
+    for uid, hosts_status in user_hosts_status.items():
+        if uid not in user_tags:
             continue
 
-        username, group = user_info
-        # Skip old points, which will clutter plots
-        if badness_obj.expired(timeout=badness_timeout):
+        username, group = user_tags[uid]
+        for hostname, status in hosts_status.items():
+            points.append(status_line.format(
+                uid,
+                username,
+                group,
+                escape_tag(hostname),
+                format_field(status.current),
+                format_field(status.default),
+                status.occurrences,
+                status.timestamp,
+                status.occur_timestamp,
+                current_time
+            ))
+        # Write out the points as they are made, rather than holding all of
+        # them in memory. The connection parameters default to the ones at
+        # the top of this file (username is also the name of a user here)
+        if len(points) >= batch_size:
+            to_influx(points)
+            points = []
+
+    # Only the badness of this host is read from statusdb
+    badness_hostname = escape_tag(sysinfo.hostname)
+    for uid, badness_obj in user_badness.items():
+        # Skip users with no passwd entry and old points, which will clutter
+        # plots
+        if (uid not in user_tags or
+                badness_obj.last_updated() < min_badness_update_ts):
             continue
 
-        json = {
-            "measurement": "arbiter_badness",
-            "tags": {
-                "user": uid,
-                "username": username,
-                "group": group,
-                "hostname": hostname
-            },
-            "fields": {
-                "cpu": badness_obj.cpu,
-                "mem": badness_obj.mem,
-                "timestamp": badness_obj.last_updated()
-            }
-        }
-        json_body.append(json)
-
-    to_influx(json_body, username, password, host, port, db)
+        username, group = user_tags[uid]
+        points.append(badness_line.format(
+            uid,
+            username,
+            group,
+            badness_hostname,
+            float(badness_obj.cpu),
+            float(badness_obj.mem),
+            badness_obj.last_updated(),
+            current_time
+        ))
+        if len(points) >= batch_size:
+            to_influx(points)
+            points = []
+
+    if points:
+        to_influx(points)
 
 
 def bootstrap(args):
@@ -217,7 +269,7 @@ def arbiter_environ():
 
         for prefix in ignored_prefixes:
             if env_value.startswith(prefix):
-                env_value = env_value.lstrip(prefix).lstrip()
+                env_value = env_value[len(prefix):].lstrip()
                 break
 
         if env_name == "ARBCONFIG":
@@ -295,5 +347,6 @@ if __name__ == "__main__":
     bootstrap(args)
     import statusdb
     import database
+    import sysinfo
     from cfgparser import cfg, shared
     main(args)
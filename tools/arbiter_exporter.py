@@ -334,7 +334,7 @@ class ArbiterCollector:
         now = time.time()
         # If Arbiter2 hasn't updated the badness data within two intervals
         # then let's not trust the score, it's out of date!
-        badness_timeout = cfg.general.arbiter_refresh * 2
+        min_badness_update_ts = now - cfg.general.arbiter_refresh * 2
 
         try:
             # read_badness returns nothing on error... sigh
@@ -360,7 +360,7 @@ class ArbiterCollector:
             # Skip old badness scores, not accurate
             if uid in per_user_badness:
                 badness_obj = per_user_badness[uid]
-                if badness_obj.expired(timeout=badness_timeout):
+                if badness_obj.last_updated() < min_badness_update_ts:
                     badness_obj = badness.Badness()  # zero badness
             else:
                 badness_obj = badness.Badness()  # Replace with zero badness
@@ -783,7 +783,7 @@ def arbiter_environ():
 
         for prefix in ignored_prefixes:
             if env_value.startswith(prefix):
-                env_value = env_value.lstrip(prefix).lstrip()
+                env_value = env_value[len(prefix):].lstrip()
                 break
 
         if env_name == "ARBCONFIG":
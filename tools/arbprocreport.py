@@ -79,17 +79,18 @@ def get_logdb_paths(args):
 
     # Read and parse each relevant file
     # Interpret and format the data from reading the files
+    # The logs of each host are in a directory named after the host (see
+    # extract_hostname_from_path()), so only look for the relevant files (in
+    # date range) in those rather than walking every file
     files_to_read = []
-    walked = os.walk(log_location)
-    for directory, _, files in walked:
-        files_to_read.extend(
-            [
-                os.path.join(directory, f)
-                for f in files
-                # Keep only the relevant files (in date range)
-                if f in filenames
-            ]
-        )
+    with os.scandir(log_location) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            for filename in filenames:
+                filepath = os.path.join(entry.path, filename)
+                if os.path.isfile(filepath):
+                    files_to_read.append(filepath)
     return files_to_read
 
 
@@ -262,7 +263,7 @@ def arbiter_environ():
 
         for prefix in ignored_prefixes:
             if env_value.startswith(prefix):
-                env_value = env_value.lstrip(prefix).lstrip()
+                env_value = env_value[len(prefix):].lstrip()
                 break
 
         if env_name == "ARBCONFIG":
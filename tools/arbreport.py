@@ -12,8 +12,14 @@
 # Written by Robben Migacz
 # Usage: ./arbreport.py (to see available arguments)
 import argparse
+import collections
+import functools
+import glob
+import itertools
+import multiprocessing
 import shlex
 import os
+import sqlite3
 import sys
 import toml
 import datetime
@@ -40,6 +46,9 @@ table_descriptions = [
     "processes have not been seen by the reporting tool before.</p>"
 ]
 
+
+# Cache the results so we don't have to look up users again for each table
+@functools.lru_cache(maxsize=None)
 def get_user_info(uid):
     uid = int(uid)  # Ensure an integer is used as the uid (or it won't work)
     username = None
@@ -60,6 +69,107 @@ def get_user_info(uid):
     return (str(username), str(group))
 
 
+def read_logdb(filename, directory):
+    """
+    Reads the actions in a logdb file and returns the number of violations of
+    each type for each user, the number of violations on the host for each
+    user, the number of actions each process was seen in and the set of
+    process names seen. If the file cannot be read, whatever was counted
+    before the error is returned.
+
+    filename: str
+        The path to the logdb file.
+    directory: str
+        The hostname the logdb file belongs to.
+    """
+    actions_by_user = collections.defaultdict(collections.Counter)
+    hosts_by_user = collections.defaultdict(collections.Counter)
+    times_proc_seen = collections.Counter()
+    procs_seen = set()
+    keys_by_procs = {}
+    try:
+        logdb_obj = logdb.LogDB(filename)
+        actions = logdb_obj.read_actions()
+
+        # Action: action, user, timestamp
+        # General: mem, cpu, time
+        # Process: name, mem, cpu, uptime, timestamp
+
+        # Get users and penalties
+        for action_obj in actions:
+            user = action_obj.user
+            description = action_obj.action
+            # logdb files may contain high_usage_warning actions, which are
+            # not applied to any specific user (rather, to the node in
+            # general); we want to skip those for user-specific analyses
+            if description == "high_usage_warning":
+                continue
+
+            # Get the number of violations of each type for each user
+            actions_by_user[user][description] += 1
+
+            # Get the number of violations on each host for each user
+            hosts_by_user[user][directory] += 1
+
+            # Count the number of times each process name is seen in a unique
+            # action (a penalty state elevation).
+            for process_obj in action_obj.process:
+                primary_key = action_obj   # The primary key associates the Process
+                                           # to an Action to avoid double-counting
+                if process_obj.name.startswith(shared.other_processes_label):
+                    continue
+                key = process_obj.name.replace(" ", "_")
+                if key not in keys_by_procs:
+                    keys_by_procs[key] = []
+                if primary_key not in keys_by_procs[key]:
+                    keys_by_procs[key].append(primary_key)
+                if key:
+                    procs_seen.add(key)
+
+    # logdb reads tables with the sqlite3 module directly, so its errors
+    # aren't always wrapped by sqlalchemy
+    except (database.SQLAlchemyError, sqlite3.Error, TypeError,
+            ValueError) as err:
+        print(
+            "Could not read database {}: {}. It is possible the schema is "
+            "not correct. Skipping.".format(filename, err)
+        )
+
+    # Collapse the primary keys into a count for each process
+    # This shows how many actions the process name is associated with;
+    # this is necessary because there are multiple Process objects for
+    # each Action object.
+    for key in keys_by_procs:
+        times_proc_seen[key] += len(keys_by_procs[key])
+
+    return actions_by_user, hosts_by_user, times_proc_seen, procs_seen
+
+
+def init_worker(cwd, path, configs):
+    """
+    Sets up a process that reads logdb files in parallel the same way
+    bootstrap() set up this one. Workers that are not forked from this process
+    (e.g. with the spawn or forkserver start methods) import this file without
+    running it as __main__, so they need to load the configuration and the
+    arbiter modules themselves.
+
+    cwd: str
+        The working directory of this process (the arbiter directory).
+    path: list
+        The Python path of this process.
+    configs: list
+        The absolute paths of the configuration files to load.
+    """
+    global database, logdb, shared
+    os.chdir(cwd)
+    sys.path[:] = path
+    import cfgparser
+    cfgparser.load_config(*configs, check=False)
+    from cfgparser import shared
+    import database
+    import logdb
+
+
 def main(
     args,
     send_email=False,
@@ -72,7 +182,8 @@ def main(
     logdb_name="{}",
     log_location=None,
     reply_to=None,
-    process_history=None
+    process_history=None,
+    parallel=1
 ):
     # Deal with times
     # If the user doesn't specify a very specific time (with a start and end
@@ -119,14 +230,15 @@ def main(
 
     # Read and parse each relevant file
     # Interpret and format the data from reading the files
+    # Assumes the hostname is the second-to-last hierarchy level for files,
+    # as in the default configuration. If that's not the case for you, this
+    # is probably the part you want to change.
     files_to_read = []
-    walked = os.walk(log_location)
-    for (directory, subdirectories, files) in walked:
-        files_to_read.extend(
-            [[directory, os.path.join(directory, f)]  # Keep hostname, filename
-             for f in files
-             if f in filenames]  # Keep only the relevant files (in date range)
-        )
+    for filename in filenames:  # Only the relevant files (in date range)
+        files_to_read.extend(glob.glob(os.path.join(
+            glob.escape(log_location), "*", glob.escape(filename)
+        )))
+    files_to_read.sort()  # Group the files by host
 
     # Get the list of processes that have been seen before, if relevant
     if process_history:
@@ -138,86 +250,37 @@ def main(
             print("Failed to open the process history file")
             process_history = False
 
-    # Collect the relevant data from the files that were identified
-    actions_by_user = {}
-    hosts_by_user = {}
-    times_proc_seen = {}
-    procs_seen = []
-    for pair in files_to_read:
-
-        filename = pair[1]
-        # Get the hostname
-        # Assumes the hostname is the second-to-last hierarchy level for files,
-        # as in the default configuration. If that's not the case for you, this
-        # is probably the part you want to change.
-        directory = pair[0].split(log_location)[1].replace("/", "")
-
-        try:
-            logdb_obj = logdb.LogDB(filename)
-            actions = logdb_obj.read_actions()
-
-            # Action: action, user, timestamp
-            # General: mem, cpu, time
-            # Process: name, mem, cpu, uptime, timestamp
-
-            # Get users and penalties
-            keys_by_procs = {}
-            for action_obj in actions:
-                user = action_obj.user
-                description = action_obj.action
-                # logdb files may contain high_usage_warning actions, which are
-                # not applied to any specific user (rather, to the node in
-                # general); we want to skip those for user-specific analyses
-                if description == "high_usage_warning":
-                    continue
-
-                # Get the number of violations of each type for each user
-                if user not in actions_by_user:
-                    actions_by_user[user] = {}
-                if description not in actions_by_user[user]:
-                    actions_by_user[user][description] = 1
-                else:
-                    actions_by_user[user][description] += 1
-
-                # Get the number of violations on each host for each user
-                if user not in hosts_by_user:
-                    hosts_by_user[user] = {}
-                if directory not in hosts_by_user[user]:
-                    hosts_by_user[user][directory] = 1
-                else:
-                    hosts_by_user[user][directory] += 1
-
-                # Count the number of times each process name is seen in a unique
-                # action (a penalty state elevation).
-                for process_obj in action_obj.process:
-                    primary_key = action_obj   # The primary key associates the Process
-                                               # to an Action to avoid double-counting
-                    if process_obj.name.startswith(shared.other_processes_label):
-                        continue
-                    key = process_obj.name.replace(" ", "_")
-                    if key not in keys_by_procs:
-                        keys_by_procs[key] = []
-                    if primary_key not in keys_by_procs[key]:
-                        keys_by_procs[key].append(primary_key)
-                    if key and key not in procs_seen:
-                        procs_seen.append(key)
-
-            # Collapse the primary keys into a count for each process
-            # This shows how many actions the process name is associated with;
-            # this is necessary because there are multiple Process objects for
-            # each Action object.
-            for key in keys_by_procs:
-                keys_by_procs[key] = len(keys_by_procs[key])
-                if key not in times_proc_seen:
-                    times_proc_seen[key] = 0
-                times_proc_seen[key] += keys_by_procs[key]
+    # Collect the relevant data from the files that were identified, with
+    # their hostname (the name of the directory they are in)
+    logdbs_to_read = [
+        (filename, os.path.basename(os.path.dirname(filename)))
+        for filename in files_to_read
+    ]
+
+    actions_by_user = collections.defaultdict(collections.Counter)
+    hosts_by_user = collections.defaultdict(collections.Counter)
+    times_proc_seen = collections.Counter()
+    procs_seen = set()
+    # The files are independent, so they can be read in parallel; the results
+    # are combined in the same order as the files so the tables are too
+    if parallel > 1:
+        with multiprocessing.Pool(
+            parallel,
+            initializer=init_worker,
+            initargs=(os.getcwd(), sys.path, args.configs)
+        ) as pool:
+            results = pool.starmap(read_logdb, logdbs_to_read)
+    else:
+        results = itertools.starmap(read_logdb, logdbs_to_read)
 
-        except:
-            print(
-                "Could not read database {}: {}. It is possible the schema is "
-                "not correct. Skipping.".format(filename, err)
-            )
-            continue
+    for file_data in results:
+        file_actions_by_user, file_hosts_by_user, file_times_proc_seen, \
+            file_procs_seen = file_data
+        for user, action_counts in file_actions_by_user.items():
+            actions_by_user[user].update(action_counts)
+            hosts_by_user[user].update(file_hosts_by_user[user])
+        times_proc_seen.update(file_times_proc_seen)
+        procs_seen |= file_procs_seen
 
     # Count the number of new processes
     times_new_proc_seen = {}
@@ -487,7 +550,7 @@ def arbiter_environ():
 
         for prefix in ignored_prefixes:
             if env_value.startswith(prefix):
-                env_value = env_value.lstrip(prefix).lstrip()
+                env_value = env_value[len(prefix):].lstrip()
                 break
 
         if env_name == "ARBCONFIG":
@@ -651,12 +714,21 @@ if __name__ == "__main__":
              "information about newly seen processes.",
         dest="processhistory"
     )
+    parser.add_argument(
+        "-p", "--parallel",
+        type=int,
+        default=1,
+        help="Use the given number of processes in parallel to read the "
+             "logs. Defaults to 1.",
+        dest="parallel"
+    )
 
     args = parser.parse_args()
     bootstrap(args)
 
     from cfgparser import cfg, shared
     import actions
+    import database
     import logdb
 
     # Some of the information is duplicated by sending it twice (once in the
@@ -675,5 +747,6 @@ if __name__ == "__main__":
         logdb_name=shared.logdb_name,
         log_location=args.loglocation,
         reply_to=args.replyto,
-        process_history=args.processhistory
+        process_history=args.processhistory,
+        parallel=args.parallel
     )
@@ -109,7 +109,7 @@ def arbiter_environ():
 
         for prefix in ignored_prefixes:
             if env_value.startswith(prefix):
-                env_value = env_value.lstrip(prefix).lstrip()
+                env_value = env_value[len(prefix):].lstrip()
                 break
 
         if env_name == "ARBCONFIG":